@@ -1,27 +1,29 @@
 """Makes barcode-wheels"""
-import array
 import base64
 import csv
+import os
 import pathlib
 import re
-import shlex
 import subprocess
 import sys
-from collections import OrderedDict, deque, namedtuple
-from functools import lru_cache, partial, reduce
-from io import StringIO
-from itertools import chain, islice
-from math import asin, cos, radians, sin
+import tempfile
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from io import BytesIO, StringIO
+from math import asin, ceil, cos, radians, sin
 from typing import Dict, Iterable, Mapping, NewType, Optional, List
 from typing import OrderedDict as OrderedDictT
-from typing import TextIO, Tuple, Union
+from typing import BinaryIO, TextIO, Tuple, Union
 
 import fontconfig
 import freetype
+import numpy as np
 import svgwrite
 from freetype import Face
 from gi.repository import GLib, HarfBuzz
-from lxml.etree import parse
+from lxml.etree import XMLParser, parse
 from svgpathtools import Line, Path, QuadraticBezier
 
 if sys.version_info < (3, 6):
@@ -36,6 +38,12 @@ PLACEHOLDER_DEFAULTS = OrderedDict(
         ("picture", {"padding": 0.02, "width": 1.0, "rotation": 90.0}),
     ]
 )
+# Keyword arguments like barcode_padding or name_width that change the layout of that placeholder
+SPACING_KEYWORDS = {
+    f"{name}_{kind}": (name, kind)
+    for name in PLACEHOLDER_DEFAULTS
+    for kind in ("padding", "width")
+}
 # Set to largest size that *probably* won't overflow
 CHAR_SIZE = 2 ** 16  # 48 * 64
 # namedtuples used as argument and return values, for easy grouping of values
@@ -44,7 +52,18 @@ Extents = namedtuple("Extents", "x_bearing, y_bearing, width, height")
 Positions = namedtuple("Positions", "x_advance, y_advance, x_offset, y_offset")
 Metrics = namedtuple("Metrics", "positions, extents, units_per_em")
 BBox = namedtuple("BBox", "width, height, y_offset, x_offset")
+Rect = namedtuple("Rect", "x, y, width, height, fill")
+PlaceholderBox = namedtuple("PlaceholderBox", "x, y, width, height, rotation, rotation_center")
 UPC = NewType("UPC", str)
+# UPCs must be 11 or fewer digits long
+UPC_LIMIT = 10 ** 11
+# Fewest UPCs worth starting another zint process for, when splitting up a batch
+ZINT_BATCH_SIZE = 100
+# Used to pull the attributes off of the <rect>s in the SVGs zint makes
+RECT_RE = re.compile(rb"<rect\s+([^/>]*)/>")
+ATTRIBUTE_RE = re.compile(rb'(\w+)="([^"]*)"')
+# Anything zint could draw with, other than <rect>s and <text>
+SHAPE_RE = re.compile(rb"<(path|circle|ellipse|line|polyline|polygon|image|use)\b")
 
 
 def upc_value(value: Union[str, int]) -> UPC:
@@ -56,6 +75,10 @@ def upc_value(value: Union[str, int]) -> UPC:
     >>> upc_value("12101")
     '00000012101'
     """
+    # Values from CSVs are usually already strings of digits, which only need padding
+    if isinstance(value, str) and len(value) <= 11 and value.isascii() and value.isdigit():
+        return UPC(value.zfill(11))
+
     error_message = "upc_value() only takes positive integer values"
     try:
         integer = int(value)
@@ -65,40 +88,151 @@ def upc_value(value: Union[str, int]) -> UPC:
     if integer < 0:
         raise ValueError(error_message)
 
-    if integer > int("9" * 11):
+    if integer >= UPC_LIMIT:
         raise ValueError("UPC values must be 11 or fewer digits long")
 
     # String formatting is used to left-pad the value to at least 11 digits long
     # using 0's for padding, and formatting the result as an integer decimal
-    return UPC(f"{integer:0>11d}")
+    return UPC(f"{integer:011d}")
+
 
+def zint_barcode(value: Union[str, int]) -> BytesIO:
+    """Runs zint to produce a barcode as an SVG, which it returns as io.BytesIO"""
+    return BytesIO(zint_svg(upc_value(value)))
 
-def zint_barcode(value: Union[str, int]) -> StringIO:
-    """Runs zint to produce a barcode as an SVG, which it returns as io.StringIO"""
-    padded_value = upc_value(value)
 
+@lru_cache(maxsize=4096, typed=False)
+def zint_svg(upc: UPC) -> bytes:
+    """
+    Runs zint to produce the SVG for a barcode of an already padded UPC
+
+    Because this is wrapped with functools.lru_cache, zint is only run once for
+    each distinct UPC
+    """
     zint_output = subprocess.run(
-        shlex.split(
-            f"zint --direct --filetype=svg --barcode=34 --notext -d '{padded_value}'"
-        ),
+        ["zint", "--direct", "--filetype=svg", "--barcode=34", "--notext", "-d", upc],
         stdout=subprocess.PIPE,
+        check=True,
     )
 
-    return StringIO(zint_output.stdout.decode("utf8"))
+    return zint_output.stdout
+
+
+def zint_batch_run(upcs: List[UPC]) -> Dict[UPC, bytes]:
+    """Runs zint once in batch mode to produce the SVGs for a list of unique, already padded UPCs"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        directory = pathlib.Path(tmpdir)
+        input_file = directory / "upcs.txt"
+        input_file.write_text("\n".join(upcs) + "\n")
+
+        # zint replaces the ~ characters with the zero-padded line number of each UPC
+        digits = len(str(len(upcs)))
+        subprocess.run(
+            [
+                "zint",
+                "--batch",
+                "--filetype=svg",
+                "--barcode=34",
+                "--notext",
+                "-i",
+                str(input_file),
+                "-o",
+                f"bc{'~' * digits}.svg",
+            ],
+            cwd=tmpdir,
+            stdout=subprocess.PIPE,
+            check=True,
+        )
+
+        return {
+            upc: (directory / f"bc{line_number:0>{digits}d}.svg").read_bytes()
+            for line_number, upc in enumerate(upcs, start=1)
+        }
+
+
+def zint_barcodes_batch(upcs: Iterable[UPC]) -> Dict[UPC, bytes]:
+    """
+    Runs zint in batch mode to produce the SVGs for many already padded UPCs,
+    and returns them in a dictionary keyed by UPC
+
+    Starting zint costs much more than having it draw a barcode, so this is preferred
+    over zint_svg() when the UPCs are all known ahead of time
+
+    Large batches are split up between several zint processes running at the same time
+    """
+    # dict.fromkeys() drops duplicates while keeping the order, which zint uses to number the files
+    unique_upcs = list(dict.fromkeys(upcs))
+    if not unique_upcs:
+        return dict()
+
+    workers = min(os.cpu_count() or 1, ceil(len(unique_upcs) / ZINT_BATCH_SIZE))
+    if workers <= 1:
+        return zint_batch_run(unique_upcs)
+
+    # Each thread only waits on its own zint process, so they don't hold each other up
+    chunk_size = ceil(len(unique_upcs) / workers)
+    chunks = [
+        unique_upcs[start : start + chunk_size]
+        for start in range(0, len(unique_upcs), chunk_size)
+    ]
+    svgs = dict()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for chunk_svgs in executor.map(zint_batch_run, chunks):
+            svgs.update(chunk_svgs)
+
+    return svgs
+
+
+# NOTE: This should use an SVG parsing library instead, so that any inconsistencies between output in different zint
+#       barcode types or versions don't result in hard-to-fix errors
+@lru_cache(maxsize=4096, typed=False)
+def zint_rects(svg: bytes) -> Tuple[Rect, ...]:
+    """
+    Scans an SVG zint made and returns the x, y, width, height, and fill of each <rect>
+
+    svgwrite elements get changed after they're made, so they can't be shared between drawings,
+    but these tuples can, which is why these are what's cached
+    """
+    rects = list()
+    # zint always writes its <rect>s the same way, so there's no need to build a whole XML tree
+    # just to read five attributes off of each of them
+    for rect_match in RECT_RE.finditer(svg):
+        attributes = dict(ATTRIBUTE_RE.findall(rect_match.group(1)))
+        if b"x" not in attributes:
+            continue
+
+        fill = attributes.get(b"fill")
+        rects.append(
+            Rect(
+                x=attributes[b"x"].decode("ascii"),
+                y=attributes[b"y"].decode("ascii"),
+                width=attributes[b"width"].decode("ascii"),
+                height=attributes[b"height"].decode("ascii"),
+                fill=fill.decode("ascii") if fill is not None else None,
+            )
+        )
+
+    # Only <rect>s are read, so a zint that draws its bars some other way would otherwise silently
+    # produce a barcode that's only the white background
+    if SHAPE_RE.search(svg) or not any(rect.fill != "#FFFFFF" for rect in rects):
+        raise TypeError("zint made something else, other than a rectangle group")
+
+    return tuple(rects)
 
 
-# NOTE: This should use an SVG parsing library instead, so that any inconsistencies between output in different zint barcode types don't result in hard-to-fix lxml errors
 def barcode_group(
     value: Union[str, int],
     clip_path: Optional[str] = None,
     background: Optional[str] = None,
+    svg: Optional[bytes] = None,
 ) -> svgwrite.container.Group:
-    """Build an svgwrite.container.Group object by parsing SVG as XML on hopes and dreams"""
-    tree = parse(zint_barcode(value))
-    root = tree.getroot()
-    group = [x for x in root.getchildren() if x.tag == "{http://www.w3.org/2000/svg}g"][
-        0
-    ]
+    """
+    Build an svgwrite.container.Group object from the <rect>s zint made for value
+
+    If the SVG zint made for value is already at hand, from zint_barcodes_batch(), it can be passed as svg
+    """
+    if svg is None:
+        svg = zint_svg(upc_value(value))
 
     barcode_group = svgwrite.container.Group(id=f"barcode-{value}")
     if clip_path:
@@ -113,48 +247,31 @@ def barcode_group(
     if background:
         barcode_group.update(dict(fill=background))
 
-    tag_re = re.compile(r"(?<=svg})\w+$")
-
-    for elem in group:
-        if "text" in elem.tag:
-            continue
-
-        tag_name_search = tag_re.search(elem.tag)
-        if not tag_name_search:
-            raise NameError("tag name does not match")
-
-        tag_name = tag_name_search.group()
-
-        if tag_name not in ["rect"]:
-            raise TypeError("zint made something else, other than a rectangle group")
-
-        Rect = namedtuple("Rect", "x, y, width, height")
-
-        if "fill" in elem.attrib:
-            fill = elem.attrib.pop("fill")
+    # The attributes came straight from zint, so svgwrite doesn't need to validate each one of them, both as
+    # they're set and again when the drawing is written out: debug=False skips that for these <rect>s
+    for rect in zint_rects(svg):
+        if rect.fill == "#FFFFFF":
+            attributes = dict(class_="background")
+        elif rect.fill:
+            attributes = dict(fill=rect.fill)
         else:
-            fill = None
-
-        rect_tuple = Rect(**elem.attrib)
-
-        if tag_name == "rect":
-            rectangle = barcode_group.add(
-                svgwrite.shapes.Rect(
-                    insert=(rect_tuple.x, rect_tuple.y),
-                    size=(rect_tuple.width, rect_tuple.height),
-                )
+            attributes = dict(class_="foreground")
+
+        barcode_group.add(
+            svgwrite.shapes.Rect(
+                insert=(rect.x, rect.y),
+                size=(rect.width, rect.height),
+                debug=False,
+                **attributes,
             )
-            if fill == "#FFFFFF":
-                rectangle.update(dict(class_="background"))
-            elif fill:
-                rectangle.update(dict(fill=fill))
-            else:
-                rectangle.update(dict(class_="foreground"))
+        )
 
     return barcode_group
 
 
-def barcode(value: Union[str, int]) -> svgwrite.container.Symbol:
+def barcode(
+    value: Union[str, int], svg: Optional[bytes] = None
+) -> Tuple[svgwrite.container.Symbol, svgwrite.masking.ClipPath]:
     """
     Build a barcode that can be placed in a <defs> and then <use>d
 
@@ -167,7 +284,9 @@ def barcode(value: Union[str, int]) -> svgwrite.container.Symbol:
     barcode_clip.add(svgwrite.shapes.Rect(insert=(0, 0), size=(1, 50 / 59)))
 
     barcode_symbol = svgwrite.container.Symbol()
-    barcode_symbol.add(barcode_group(value=value, clip_path=barcode_clip.get_funciri()))
+    barcode_symbol.add(
+        barcode_group(value=value, clip_path=barcode_clip.get_funciri(), svg=svg)
+    )
 
     # The viewbox is restricted to the same size as the resulting clipPath
     barcode_symbol.viewbox(0, 0, 115, 50)
@@ -187,8 +306,20 @@ def get_font_file_in_current_directory() -> freetype.Face:
     return Face(str(font_paths[0].resolve(strict=True)))
 
 
+@lru_cache(maxsize=32, typed=False)
 def get_font_file(pattern: str = "sans-serif") -> pathlib.Path:
-    """Uses fontconfig to return a pathlib.Path object pointing to the font file fontconfig found for the given pattern"""
+    """
+    Uses fontconfig to return a pathlib.Path object pointing to the font file fontconfig found for the given pattern
+
+    Asking fontconfig means it has to go through its cache of all the system's fonts, so the answer for each
+    pattern is kept with functools.lru_cache
+
+    If pattern is already the absolute path of a font file, that file is used without asking fontconfig
+    """
+    font_path = pathlib.Path(pattern)
+    if font_path.is_absolute() and font_path.is_file():
+        return font_path.resolve(strict=True)
+
     current_font_config = fontconfig.Config.get_current()
     fontconfig_pattern = fontconfig.Pattern.name_parse(pattern)
     current_font_config.substitute(fontconfig_pattern, fontconfig.FC.MatchPattern)
@@ -204,18 +335,20 @@ def get_font_file(pattern: str = "sans-serif") -> pathlib.Path:
     return pathlib.Path(file_path).resolve(strict=True)
 
 
-@lru_cache(maxsize=1, typed=False)
-def setup_harfbuzz(font_family: str) -> Tuple[HarfBuzz.font_t, int, HarfBuzz.buffer_t]:
+@lru_cache(maxsize=32, typed=False)
+def setup_harfbuzz(font_family: str) -> Tuple[HarfBuzz.font_t, int]:
     """
-    Finds a font for HarfBuzz to use, and creates a buffer
+    Finds a font for HarfBuzz to use, and returns it along with its units_per_em
 
-    Because this is wrapped with functools.lru_cache, the buffer returned
-    may have text still in it, which means
-    gi.repository.HarfBuzz.buffer_clear_contents()
-    will need to be called on the buffer to return it to its empty state
+    Because this is wrapped with functools.lru_cache, the font file is only read and
+    set up once for each font_family
     """
     font_file = get_font_file(font_family)
-    font_blob = HarfBuzz.glib_blob_create(GLib.Bytes.new(font_file.read_bytes()))
+    if hasattr(HarfBuzz, "blob_create_from_file"):
+        # HarfBuzz memory-maps the file itself, instead of it being copied into Python and then into GLib
+        font_blob = HarfBuzz.blob_create_from_file(str(font_file))
+    else:
+        font_blob = HarfBuzz.glib_blob_create(GLib.Bytes.new(font_file.read_bytes()))
     face = HarfBuzz.face_create(font_blob, 0)
     del font_blob
     font = HarfBuzz.font_create(face)
@@ -223,61 +356,86 @@ def setup_harfbuzz(font_family: str) -> Tuple[HarfBuzz.font_t, int, HarfBuzz.buf
     del face
     HarfBuzz.font_set_scale(font, upem, upem)
     HarfBuzz.ot_font_set_funcs(font)
-    buffer = HarfBuzz.buffer_create()
-    # HarfBuzz.buffer_set_message_func(
-    #    buffer,
-    #    lambda *args: True,
-    #    1,
-    #    0,
-    # )
 
-    return (font, upem, buffer)
+    return (font, upem)
+
 
+def get_upem(font_family: str) -> int:
+    """Returns the units_per_em of the font HarfBuzz uses for font_family, without shaping any text"""
+    return setup_harfbuzz(font_family)[1]
 
-def glyphs_extents(
-    font: HarfBuzz.font_t, codepoints: Iterable[int]
-) -> Iterable[Extents]:
+
+# HarfBuzz buffers hold the text being shaped, so unlike fonts, they can't be shared between threads
+HARFBUZZ_BUFFERS = threading.local()
+
+
+def harfbuzz_buffer() -> HarfBuzz.buffer_t:
     """
-    Takes a HarfBuzz font object and a list of codepoints within that font, and generates
-    the glyph extents HarfBuzz finds for that codepoint
+    Returns the HarfBuzz buffer for the current thread, creating it the first time
+
+    The buffer returned may have text still in it, which means
+    gi.repository.HarfBuzz.buffer_clear_contents()
+    will need to be called on the buffer to return it to its empty state
     """
-    for extent in (
-        HarfBuzz.font_get_glyph_extents(font, codepoint)[1] for codepoint in codepoints
-    ):
-        yield Extents(extent.x_bearing, extent.y_bearing, extent.width, extent.height)
+    buffer = getattr(HARFBUZZ_BUFFERS, "buffer", None)
+    if buffer is None:
+        buffer = HarfBuzz.buffer_create()
+        # HarfBuzz.buffer_set_message_func(
+        #    buffer,
+        #    lambda *args: True,
+        #    1,
+        #    0,
+        # )
+        HARFBUZZ_BUFFERS.buffer = buffer
+
+    return buffer
+
+
+@lru_cache(maxsize=4096, typed=False)
+def glyph_extents(font_family: str, codepoint: int) -> Extents:
+    """
+    Returns the glyph extents HarfBuzz finds for a codepoint within the font for font_family
+
+    The same few glyphs make up most of the text on a wheel, so with functools.lru_cache, HarfBuzz
+    is only asked about each glyph once per font_family
+    """
+    font = setup_harfbuzz(font_family)[0]
+    extent = HarfBuzz.font_get_glyph_extents(font, codepoint)[1]
+    return Extents(extent.x_bearing, extent.y_bearing, extent.width, extent.height)
 
 
-def glyph_metrics(string: str, font_family: str) -> Iterable[Metrics]:
-    """Generates a metrics object describing the metrics of each character group in a string, for a particular font"""
-    font, upem, buffer = setup_harfbuzz(font_family)
+@lru_cache(maxsize=2048, typed=False)
+def glyph_metrics(string: str, font_family: str) -> Tuple[Metrics, ...]:
+    """
+    Returns a metrics object describing the metrics of each character group in a string, for a particular font
+
+    Because this is wrapped with functools.lru_cache, each string is only shaped once per font_family
+    """
+    font, upem = setup_harfbuzz(font_family)
+    buffer = harfbuzz_buffer()
     HarfBuzz.buffer_clear_contents(buffer)
 
-    if False:
-        HarfBuzz.buffer_add_utf8(buffer, string.encode("utf-8"), 0, -1)
-    elif sys.maxunicode == 0x10FFFF:
-        HarfBuzz.buffer_add_utf32(
-            buffer, array.array("I", string.encode("utf-32"))[1:], 0, -1
-        )
-    else:
-        HarfBuzz.buffer_add_utf16(
-            buffer, array.array("H", string.encode("utf-16"))[1:], 0, -1
-        )
+    # HarfBuzz decodes UTF-8 itself, so the string only needs to be encoded once, with no BOM to strip off
+    HarfBuzz.buffer_add_utf8(buffer, string.encode("utf-8"), 0, -1)
 
     # If this doesn't get run, the Python interpreter crashes
     HarfBuzz.buffer_guess_segment_properties(buffer)
 
     HarfBuzz.shape(font, buffer, [])
-    codepoints = [info.codepoint for info in HarfBuzz.buffer_get_glyph_infos(buffer)]
+    infos = HarfBuzz.buffer_get_glyph_infos(buffer)
     positions = HarfBuzz.buffer_get_glyph_positions(buffer)
 
-    for extents, pos in zip(glyphs_extents(font, codepoints), positions):
-        yield Metrics(
+    return tuple(
+        Metrics(
             Positions(pos.x_advance, pos.y_advance, pos.x_offset, pos.y_offset),
-            extents,
+            glyph_extents(font_family, info.codepoint),
             upem,
         )
+        for info, pos in zip(infos, positions)
+    )
 
 
+@lru_cache(maxsize=2048, typed=False)
 def text_bounding_box(string: str, font_family: str) -> BBox:
     """
     Returns the bounding box of a given string of text, for a given font, as seen by HarfBuzz
@@ -291,36 +449,50 @@ def text_bounding_box(string: str, font_family: str) -> BBox:
 
     This bounding box is in unite of units_per_em, which by default is CHAR_SIZE
     """
-    # First, get a list of the metrics of each character from HarfBuzz
-    metrics = list(glyph_metrics(string, font_family))
-
-    # The maximum height of the characters from y=0
-    # HarfBuzz draws characters y-axis up, and measures each character's height as the distance from the y-axis top of the character,
-    # down to the y-axis bottom of the character
-    # This means the height is negative, but the y_bearing (top of the character from y=0) is positive
-    max_character_height = max((metric.extents.y_bearing) for metric in metrics)
-
-    # Find the lowest point on the y-axis for any character by taking the y_bearing and "subtracting" the height of the character, to get the y-axis up y height of the lowest point on the character on the y-axis, from y=0:
-    # The character 'y' extends below y=0, so the y_bearing is less than abs(height), so taking y_bearing + height gives the y-axis position of the lowest point of the character 'y', with the y-axis pointing up
-    min_character_height = min((metric.extents.y_bearing + metric.extents.height) for metric in metrics)
+    # First, get the metrics of each character from HarfBuzz
+    metrics = glyph_metrics(string, font_family)
+
+    # All of the measurements below are gathered in one pass over the metrics
+    first_extents = metrics[0].extents
+    max_character_height = first_extents.y_bearing
+    min_character_height = first_extents.y_bearing + first_extents.height
+    string_width = 0
+    last = None
+    for metric in metrics:
+        extents = metric.extents
+
+        # The maximum height of the characters from y=0
+        # HarfBuzz draws characters y-axis up, and measures each character's height as the distance from the y-axis top of the character,
+        # down to the y-axis bottom of the character
+        # This means the height is negative, but the y_bearing (top of the character from y=0) is positive
+        if extents.y_bearing > max_character_height:
+            max_character_height = extents.y_bearing
+
+        # Find the lowest point on the y-axis for any character by taking the y_bearing and "subtracting" the height of the character, to get the y-axis up y height of the lowest point on the character on the y-axis, from y=0:
+        # The character 'y' extends below y=0, so the y_bearing is less than abs(height), so taking y_bearing + height gives the y-axis position of the lowest point of the character 'y', with the y-axis pointing up
+        bottom = extents.y_bearing + extents.height
+        if bottom < min_character_height:
+            min_character_height = bottom
+
+        # Each character has an x_advance, which is how much distance it takes on the x-axis to get from the current characters x_bearing position to the start of the next characters x_bearing position
+        # Using this, we can add up all but the last character's x_advances to get the x-axis position of where to measure the last character's x_bearing from
+        if last is not None:
+            string_width += last.positions.x_advance
+        last = metric
 
     # The true height of the string of characters is the highest character height - lowest character drawing point
     true_height = max_character_height - min_character_height
 
-    # Each character has an x_advance, which is how much distance it takes on the x-axis to get from the current characters x_bearing position to the start of the next characters x_bearing position
-    # Using this, we can add up all but the last character's x_advances to get the x-axis position of where to measure the last character's x_bearing from
-    string_width = sum(metric.positions.x_advance for metric in metrics[:-1])
-
     # The left side of the current character is the sum of the x_advances of the characters left of the current character, plus this character's x_bearing
     # Then, the right side is that plus the width of the last character
-    string_width += metrics[-1].extents.x_bearing + metrics[-1].extents.width
+    string_width += last.extents.x_bearing + last.extents.width
     return BBox(
         width=string_width,
         height=true_height,
         # Here, the y_offset and x_offset of the bounding box for the string is where to put the SVG text insertion point so that the top left of the first character's bounding box will be at (0, 0)
         y_offset=max_character_height,
         # We use x_bearing here so that the entire string is scooted to the left so that the first character starts at 0 on the x-axis
-        x_offset=-metrics[0].extents.x_bearing,
+        x_offset=-first_extents.x_bearing,
     )
 
 
@@ -328,7 +500,7 @@ def scale_factor(starting_box: Tuple[int, int], target_box: Tuple[int, int]) ->
     """By what factor should a given box be scaled by so that it would fit perfectly
     inside a given target box?
     """
-    if any(x <= 0 for x in chain(starting_box, target_box)):
+    if starting_box[0] <= 0 or starting_box[1] <= 0 or target_box[0] <= 0 or target_box[1] <= 0:
         raise ValueError("scale_factor takes only positive numbers")
 
     scale_width = target_box[0] / starting_box[0]
@@ -387,10 +559,11 @@ def font_size_in_box(target_box: Tuple[float, float], text: str, font_family: st
     """
     bounding_box = text_bounding_box(string=text, font_family=font_family)
     scale = scale_factor(starting_box=(bounding_box.width, bounding_box.height), target_box=target_box)
-    original_font_size = list(glyph_metrics(string=text, font_family=font_family))[0].units_per_em
+    original_font_size = get_upem(font_family)
     return original_font_size * scale
 
 
+@lru_cache(maxsize=256, typed=False)
 def text_filled_area(
     text: str, font_family: str, **kwargs
 ) -> svgwrite.container.Symbol:
@@ -400,13 +573,15 @@ def text_filled_area(
     font_family must be specified both for HarfBuzz and the renderer that render the SVG containing this so that the text actually fills the box
     
     If the renderer uses a different font, the resulting image is most likely going to have text that does not fit where it's been told to
+
+    Because this is wrapped with functools.lru_cache, the same text returns the same symbol, so it should
+    only be <use>d, and not changed after it's made
     """
     if "font_size" in kwargs:
         raise TypeError(
             "text_filled_area() cannot be passed font_size, as this is used to make sure the text is scaled properly\nInstead, use svgwrite.text.Text() to make a new <text> tag"
         )
 
-    metrics = list(glyph_metrics(text, font_family))
     bounding_box = text_bounding_box(text, font_family)
 
     symbol = svgwrite.container.Symbol()
@@ -414,7 +589,7 @@ def text_filled_area(
         svgwrite.text.Text(
             text=text,
             insert=(bounding_box.x_offset, bounding_box.y_offset),
-            font_size=metrics[0].units_per_em,
+            font_size=get_upem(font_family),
             font_family=font_family,
             **kwargs,
         )
@@ -430,35 +605,86 @@ def text_filled_area(
     return symbol
 
 
-def svg_uri_embed(file_like: TextIO) -> StringIO:
-    """Takes an SVG file in a TextIO and returns a StringIO with that SVG embedded in a data uri that can be put in an <img href="...">"""
+def svg_uri_embed(file_like: Union[bytes, BinaryIO, TextIO]) -> StringIO:
+    """
+    Takes an SVG as bytes, or in a BinaryIO or TextIO, and returns a StringIO with that SVG embedded in a data uri that can be put in an <img href="...">
+
+    The SVGs from zint_barcode() are already bytes, so they don't need to be decoded and encoded again
+    """
+    if isinstance(file_like, bytes):
+        file_like = BytesIO(file_like)
+
     mime_type = "data:image/svg+xml;base64,"
-    uri = StringIO(mime_type)
-    uri.seek(0, 2)  # Move to end of "file"
+    uri = StringIO()
+    uri.write(mime_type)
     file_like.seek(0, 0)  # Move to beginning of "file"
-    uri.write(
-        base64.b64encode(
-            file_like.read().encode("utf8")
-        ).decode()  # Don't want bytes, want strings
-    )
+
+    # Encoding a piece at a time means the whole SVG is never in memory more than once
+    # base64 only pads the end of what it's given when the length isn't a multiple of 3,
+    # so any extra bytes are carried over to the next piece
+    leftover = b""
+    while True:
+        chunk = file_like.read(48 * 1024)
+        if not chunk:
+            break
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf8")
+        data = leftover + chunk
+        cut = len(data) - len(data) % 3
+        uri.write(base64.b64encode(data[:cut]).decode())  # Don't want bytes, want strings
+        leftover = data[cut:]
+    uri.write(base64.b64encode(leftover).decode())
+
     uri.seek(0, 0)
     return uri
 
 
-def csv_contents(csvfile: str) -> Iterable[OrderedDictT[str, str]]:
-    """Generates a list of dictionaries containing the values from CSVs the barcode_wheel should use"""
+def save_drawing(drawing: svgwrite.Drawing, pretty: bool = False) -> None:
+    """
+    Writes drawing to drawing.filename, the same as svgwrite.Drawing.save()
+
+    svgwrite pretty prints by parsing the whole drawing again with xml.dom.minidom, which is written in Python
+    and is slow for drawings with a lot of elements, so when pretty is True, lxml does the parsing and printing
+    """
+    if not pretty:
+        drawing.save()
+        return
+
+    # Drawing.write() also writes the XML declaration and any stylesheets, and lxml keeps those when printing
+    # strip_cdata=False keeps the CSS in <style> wrapped in CDATA, like svgwrite writes it
+    # huge_tree=True lifts lxml's 10MB limit on a single attribute, which pictures embedded with svg_uri_embed()
+    # can go over
+    document = StringIO()
+    drawing.write(document)
+    tree = parse(BytesIO(document.getvalue().encode("utf-8")), XMLParser(strip_cdata=False, huge_tree=True))
+    tree.write(drawing.filename, encoding="utf-8", xml_declaration=True, pretty_print=True)
+
+
+def load_csv(csvfile: str) -> List[Dict[str, Optional[Union[str, UPC]]]]:
+    """
+    Returns a list of dictionaries containing the values from CSVs the barcode_wheel should use,
+    with the UPC values already run through upc_value()
+    """
     path = pathlib.Path(csvfile).resolve(strict=True)
-    fieldnames = "UPC NAME PICTURE".split()
+    rows = list()
     with path.open(mode="r", newline="") as file:
-        reader = csv.DictReader(file, fieldnames=fieldnames)
-        yield from reader
+        # The columns are always UPC, NAME, PICTURE, so the rows are read as plain lists
+        # and each dictionary is only built once
+        for row in csv.reader(file):
+            if not row:
+                continue
+            # Like csv.DictReader, missing columns are None, and extra ones are ignored
+            upc, name, picture = (row + [None, None])[:3]
+            rows.append({"UPC": upc_value(upc), "NAME": name, "PICTURE": picture})
+
+    return rows
 
 
 def csv_by_upc(
     row_list: Iterable[Dict[str, str]]
 ) -> Iterable[Dict[str, Mapping[str, str]]]:
     """
-    Reformats the dictionary returned by csv_contents() to have a dictionary with the key as the UPC and the rest of the row contents as the value
+    Reformats the dictionaries returned by load_csv() to have a dictionary with the key as the UPC and the rest of the row contents as the value
 
     This can be used with a new dictionary's .update() method to make a dictionary of the CSV contents
     organized by UPC.
@@ -469,43 +695,35 @@ def csv_by_upc(
         yield {row.pop("UPC"): row}
 
 
-def clean_upcs(
-    row_list: Iterable[Mapping[str, str]]
-) -> Iterable[OrderedDictT[str, Union[str, UPC]]]:
-    """Runs the return of csv_contents() UPC values through upc_value()"""
-    for row in row_list:
-        if "UPC" in row:
-            row["UPC"] = upc_value(row["UPC"])
-        yield row
+def attach_barcodes(
+    rows: List[Dict[str, Optional[Union[str, UPC]]]]
+) -> List[Dict[str, Optional[Union[str, UPC, Tuple[svgwrite.container.Symbol, svgwrite.masking.ClipPath]]]]]:
+    """
+    Adds the barcode <symbol> and its <clipPath> from barcode() to each of the rows returned by load_csv() using
+    the UPC values
 
+    zint is only run once, for all of the UPCs together
+    """
+    svgs = zint_barcodes_batch(row["UPC"] for row in rows)
+    for row in rows:
+        row["BARCODE"] = barcode(row["UPC"], svg=svgs[row["UPC"]])
 
-def add_barcode(
-    row_list: Iterable[Mapping[str, Union[str, UPC]]]
-) -> Iterable[Mapping[str, Union[str, UPC, svgwrite.container.Group]]]:
-    """Adds a barcode SVG element to the contents returned by csv_contents() using the UPC values"""
-    for row in row_list:
-        if "UPC" in row:
-            row["BARCODE"] = barcode(row["UPC"])
-        yield row
+    return rows
 
 
 def gen_vertices(
         num_slices: int,
         center: Tuple[float, float],
         radius: float,
-) -> Iterable[Tuple[float, float]]:
-    """Generates the coordinates of where each slice of the wheel intersects the circumference"""
-    angle = 0.0
-    while True:
-        yield (
-            cos(radians(angle)) * radius + center[0],
-            sin(radians(angle)) * radius + center[1],
-        )
-
-        angle += 360 / num_slices
+) -> List[Tuple[float, float]]:
+    """Returns the coordinates of where each slice of the wheel intersects the circumference"""
+    # All the angles are known up front, so numpy can find all the coordinates at once
+    angles = np.arange(num_slices) * (2 * np.pi / num_slices)
+    xs = np.cos(angles) * radius + center[0]
+    ys = np.sin(angles) * radius + center[1]
 
-        if angle >= 360:
-            break
+    # tolist() turns these back into Python floats, so they're written out the same way in the SVG
+    return list(zip(xs.tolist(), ys.tolist()))
 
 
 def gen_slice_points(
@@ -516,96 +734,88 @@ def gen_slice_points(
     """
     Generates the coordinate pairs used to draw each slice of the pie
 
-    Takes the list of points given by gen_vertices and returns ([0], [-1]), ([1], [0]), ([2], [1]), etc...
+    Takes the list of points given by gen_vertices and returns ([0], [1]), ([1], [2]), ..., ([-1], [0])
     """
-    vertices = deque(
-        gen_vertices(
-            num_slices=num_slices,
-            center=center,
-            radius=radius,
-        )
-    )
-    rotated_vertices = deque(
-        gen_vertices(
-            num_slices=num_slices,
-            center=center,
-            radius=radius,
-        )
+    vertices = gen_vertices(
+        num_slices=num_slices,
+        center=center,
+        radius=radius,
     )
-    rotated_vertices.rotate(-1)
-    yield from zip(vertices, rotated_vertices)
+    yield from zip(vertices, vertices[1:] + vertices[:1])
 
 
 def box_height(
     percent_distance_from_center: float, radius: float, num_slices: int
 ) -> float:
     """Compute the maximum height of a rectangle positioned on the midline of a slice based on the distance from the center of the pie, and the number of slices of pie"""
-    half_angle = radians((360 / num_slices) / 2)
+    half_angle = radians(180 / num_slices)
     return sin(half_angle) * percent_distance_from_center * radius * 2
 
 
-def placeholder_last(
+def placeholder_last_box(
     num_slices: int,
     center: Tuple[float, float],
     radius: float,
-    placeholder: svgwrite.container.Symbol,
     percent_distance_from_center: float,
-    **kwargs) -> svgwrite.container.Use:
-    """Used to compute the correct <use> width, height, and insert coordinates so that the area perfectly fills what's left of the slice, meeting the slice's arc segment"""
+) -> PlaceholderBox:
+    """Used to compute the correct width, height, and insert coordinates so that the area perfectly fills what's left of the slice, meeting the slice's arc segment"""
 
     height = box_height(
-        percent_distance_from_center = percent_distance_from_center,
+        percent_distance_from_center=percent_distance_from_center,
         radius=radius,
         num_slices=num_slices,
     )
 
-    half_angle = radians((360 / num_slices) / 2)
-    width = cos(asin(height / (2 * radius))) * radius - percent_distance_from_center * radius * cos(half_angle)
+    half_angle = radians(180 / num_slices)
+    # Distance along the slice's midline from the center of the pie to the left side of the box
+    left_distance = percent_distance_from_center * radius * cos(half_angle)
+    width = cos(asin(height / (2 * radius))) * radius - left_distance
 
-    x = center[0] + percent_distance_from_center * cos(half_angle) * radius
+    x = center[0] + left_distance
     y = center[1] - height / 2
 
-    last_use = svgwrite.container.Use(
-        href=placeholder,
-        insert=(x, y),
-        size=(width, height),
-        **kwargs,
-    )
-
-    last_use.rotate(
-        90,
-        center=(
+    return PlaceholderBox(
+        x=x,
+        y=y,
+        width=width,
+        height=height,
+        rotation=90,
+        rotation_center=(
             x + width / 2,
             y + height / 2,
         ),
     )
 
-    return last_use
 
-
-def placeholder_use(
+def placeholder_boxes(
     num_slices: int,
     center: Tuple[float, float],
     radius: float,
-    placeholder: svgwrite.container.Symbol,
-    placeholder_layout: Iterable[Dict[str, float]],
-    **kwargs) -> Iterable[svgwrite.container.Use]:
-    """Generates the appropriate <use>s for the requested placeholder layout"""
+    placeholder_layout: OrderedDictT[str, Dict[str, float]],
+) -> List[PlaceholderBox]:
+    """
+    Computes the boxes for the requested placeholder layout, for a slice whose midline lies along the x-axis
+
+    Every slice of the wheel is the same shape, so these only need to be computed once for a whole wheel
+    """
 
     placeholder_dicts = list(placeholder_layout.values())
     if len(placeholder_dicts) <= 0:
-        return
+        return list()
     elif len(placeholder_dicts) == 1:
-        yield placeholder_last(
-            num_slices=num_slices,
-            center=center,
-            radius=radius,
-            placeholder=placeholder,
-            percent_distance_from_center=placeholder_dict[0]["padding"],
-            **kwargs,
-        )
-        return
+        return [
+            placeholder_last_box(
+                num_slices=num_slices,
+                center=center,
+                radius=radius,
+                percent_distance_from_center=placeholder_dicts[0]["padding"],
+            )
+        ]
+
+    # This only depends on the number of slices, so it's the same for every placeholder
+    radius_cos_half = radius * cos(radians(180 / num_slices))
 
+    boxes = list()
     left_percent_distance_from_center = float(0)
     right_percent_distance_from_center = float(0)
     for placeholder_dict in placeholder_dicts[:-1]:
@@ -618,50 +828,64 @@ def placeholder_use(
             num_slices=num_slices,
         )
 
-        half_angle = radians((360 / num_slices) / 2)
-
-        width = placeholder_dict["width"] * radius * cos(half_angle)
-
-        placeholder_use = svgwrite.container.Use(
-            href=placeholder,
-            insert=(
-                center[0] + left_percent_distance_from_center * cos(half_angle) * radius,
-                center[1] - height / 2,
-            ),
-            size=(width, height),
-            **kwargs,
+        width = placeholder_dict["width"] * radius_cos_half
+
+        left_x = center[0] + left_percent_distance_from_center * radius_cos_half
+
+        boxes.append(
+            PlaceholderBox(
+                x=left_x,
+                y=center[1] - height / 2,
+                width=width,
+                height=height,
+                rotation=placeholder_dict["rotation"],
+                rotation_center=(
+                    left_x + width / 2,
+                    center[1],
+                ),
+            )
         )
 
-        placeholder_use.rotate(
-            placeholder_dict["rotation"],
-            center=(
-                center[0] + left_percent_distance_from_center * cos(half_angle) * radius + width / 2,
-                center[1],
-            ),
+    last_left_padding = right_percent_distance_from_center + placeholder_dicts[-1]["padding"]
+
+    boxes.append(
+        placeholder_last_box(
+            num_slices=num_slices,
+            center=center,
+            radius=radius,
+            percent_distance_from_center=last_left_padding,
         )
+    )
+    return boxes
 
-        yield placeholder_use
 
-    last_left_padding = right_percent_distance_from_center + placeholder_dicts[-1]["padding"]
+def box_use(
+    placeholder: svgwrite.container.Symbol,
+    box: PlaceholderBox,
+    **kwargs) -> svgwrite.container.Use:
+    """
+    Makes a <use> of placeholder that fills box
 
-    yield placeholder_last(
-        num_slices=num_slices,
-        center=center,
-        radius=radius,
-        placeholder=placeholder,
-        percent_distance_from_center=last_left_padding,
+    A wheel has one of these for every placeholder in every slice. When the only attributes are the ones computed
+    here, svgwrite is told not to check each one as it's set and again when the drawing is written out. Any
+    extra attributes in kwargs come from the caller, so then svgwrite checks everything, as usual.
+    """
+    use = svgwrite.container.Use(
+        href=placeholder,
+        insert=(box.x, box.y),
+        size=(box.width, box.height),
+        debug=bool(kwargs),
         **kwargs,
     )
-    return
+
+    use.rotate(box.rotation, center=box.rotation_center)
+
+    return use
 
 
 def placeholder_group(
-    num_slices: int,
-    center: Tuple[float, float],
-    radius: float,
     placeholder: svgwrite.container.Symbol,
-    # NOTE: Would love to make this able to take an Iterable[Dict[str, float]]
-    placeholder_layout: OrderedDictT[str, Dict[str, float]],
+    boxes: Iterable[PlaceholderBox],
     **kwargs,
 ) -> Tuple[List[svgwrite.container.Use], svgwrite.container.Group]:
     """
@@ -669,21 +893,45 @@ def placeholder_group(
 
     The placeholder <use>s can be used to update the href of the use are within that group, so even after the
     slice group has been placed within another group, what that <use> uses can be changed
+
+    The boxes come from placeholder_boxes(), which only needs to be run once for every slice in a wheel
     """
-    slice_group = svgwrite.container.Group()
+    slice_group = svgwrite.container.Group(debug=False)
     placeholder_list = list()
-    for holder in placeholder_use(
+    for box in boxes:
+        holder = slice_group.add(box_use(placeholder, box, **kwargs))
+        placeholder_list.append(holder)
+
+    return (placeholder_list, slice_group)
+
+
+def wheel_path_data(
+    num_slices: int,
+    center: Tuple[float, float],
+    radius: float,
+) -> str:
+    """
+    Returns the d="..." attribute of the <path> that outlines every slice of the wheel
+
+    The whole string is built at once, instead of pushing each command onto an svgwrite.path.Path
+    """
+    move_to_center = f"M {center[0]} {center[1]}"
+    commands = [move_to_center]  # Start in the center of the pie
+
+    for ((line_to_x, line_to_y), (arc_to_x, arc_to_y)) in gen_slice_points(
         num_slices=num_slices,
         center=center,
-        radius=radius,
-        placeholder=placeholder,
-        placeholder_layout=placeholder_layout,
-        **kwargs,
+        radius=radius
     ):
-        slice_group.add(holder)
-        placeholder_list.append(holder)
+        # For each step, draw line to point1, draw a clockwise arc to point2, then move back to center
+        # Repeat with point2 as point1
+        commands.append(
+            f"L {line_to_x} {line_to_y} A {radius} {radius} 0 0,1 {arc_to_x} {arc_to_y} {move_to_center}"
+        )
 
-    return (placeholder_list, slice_group)
+    commands.append("Z")  # Close path
+
+    return " ".join(commands)
 
 
 def wheel_template(
@@ -700,27 +948,23 @@ def wheel_template(
     - A list containing each slice groups placeholders in their order of appearance in the group
     - The default placeholder element used, that should be added to the SVGs <defs>, as it is <use>d in the wheel
     """
-    # NOTE: This should have the actual generation of the wheel <path> be split out into its own function.
-    #       This would make changing it so that the wheel slice "widths" can be varied depending on the contents
-    
-    spacing_name_re = re.compile(r"^(?P<name>[a-z]+)_(?P<kind>(padding)|(width))$")
+    # NOTE: The wheel <path> comes from wheel_path_data(), which could be changed so that the wheel slice "widths"
+    #       can be varied depending on the contents
 
     placeholder_layout = {
         name: value.copy() for name, value in PLACEHOLDER_DEFAULTS.items()
     }
-    keys = kwargs.copy().keys()
-    for arg in keys:
-        variable = spacing_name_re.match(arg)
-        if not variable:
-            continue
-        name = variable.group("name")
-        kind = variable.group("kind")
-        if name not in placeholder_layout:
+    for arg in list(kwargs):
+        spacing = SPACING_KEYWORDS.get(arg)
+        if spacing is None:
             continue
+        name, kind = spacing
+        # Remove from kwargs so that they aren't passed as SVG attributes to the placeholders
         placeholder_layout[name][kind] = kwargs.pop(arg)
 
-    #if reduce(sum, [sum(x.values()) for x in placeholder_layout.values()]) - 1 > 1:
-    if sum(map(lambda x: sum(y for z, y in x.items() if z in ["padding", "width"]), placeholder_layout.values())) - 1 > 1:
+    # The picture's width of 1.0 only means it fills whatever is left, so everything else can take up to 100%
+    total = sum(value["padding"] + value["width"] for value in placeholder_layout.values())
+    if total > 2:
         raise ValueError(
             f"The paddings and widths of the slice components took up more than 100% of the length of the slice:\n{placeholder_layout}"
         )
@@ -729,50 +973,35 @@ def wheel_template(
     wheel = svgwrite.container.Group()
 
     wheel_slices = svgwrite.path.Path(
-        d=f"M {center[0]} {center[1]}",
+        d=wheel_path_data(num_slices=num_slices, center=center, radius=radius),
         fill="none",
         stroke="black",
         stroke_width=1.0,
     )
 
-    for ((line_to_x, line_to_y), (arc_to_x, arc_to_y)) in gen_slice_points(
-        num_slices=num_slices,
-        center=center,
-        radius=radius
-    ):
-        wheel_slices.push(
-            f"L {line_to_x} {line_to_y}"
-        )  # For each step, draw line to point1...
-        wheel_slices.push_arc(  # Draw arc to point2...
-            target=(arc_to_x, arc_to_y),
-            rotation=0,
-            r=radius,
-            large_arc=False,
-            angle_dir="+",
-            absolute=True,
-        )
-        wheel_slices.push(f"M {center[0]} {center[1]}")  # Move back to center...
-        # Repeat with point2 as point1
-
-    wheel_slices.push(f"Z")  # Close path
-
     wheel.add(wheel_slices)
 
     placeholders = list()
     placeholder = text_filled_area("placeholder", "sans-serif")
 
+    # Each slice is only rotated differently, so the placeholder boxes are the same for all of them
+    boxes = placeholder_boxes(
+        num_slices=num_slices,
+        center=center,
+        radius=radius,
+        placeholder_layout=placeholder_layout,
+    )
+
+    slice_angle = 360 / num_slices
     for slice_num in range(num_slices):
         placeholder_list, slice_group = placeholder_group(
             placeholder=placeholder,
-            placeholder_layout=placeholder_layout,
-            center=center,
-            radius=radius,
-            num_slices=num_slices,
+            boxes=boxes,
             **kwargs,
         )
 
         slice_group.rotate(
-            angle=((360 / num_slices) * (slice_num - 0.5)),
+            angle=(slice_angle * (slice_num - 0.5)),
             center=center,
         )
         placeholders.append(placeholder_list)
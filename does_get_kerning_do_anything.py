@@ -1,6 +1,6 @@
 from freetype import Face
 import pathlib
-from itertools import combinations, starmap, chain
+from itertools import combinations, starmap
 
 
 def main():
@@ -17,12 +17,17 @@ def main():
     # Compute all kerning vectors for different characters next to each other
     vectors = starmap(face.get_kerning, combinations(alphabet, 2))
 
-    # Extract all the x and y values into a single, flat list
-    flat_vectors = list(chain.from_iterable([(vec.x, vec.y) for vec in vectors]))
+    # Keep track of the max and min x and y values as the vectors come in, instead of
+    # flattening them all into a list first
+    maximum = float("-inf")
+    minimum = float("inf")
+    for vec in vectors:
+        maximum = max(maximum, vec.x, vec.y)
+        minimum = min(minimum, vec.x, vec.y)
 
-    # Find and print the max and min
+    # Print the max and min
     print(
-        f"The maximum value found was: {max(flat_vectors)}\nThe minimum value found was: {min(flat_vectors)}"
+        f"The maximum value found was: {maximum}\nThe minimum value found was: {minimum}"
     )
 
 
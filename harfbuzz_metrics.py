@@ -69,7 +69,7 @@ def main():
     )
     drawing.viewbox(-window.width * 0.1, -window.height * 0.1, window.width * 1.2, window.height * 1.2)
     drawing.fit()
-    drawing.save(pretty=True)
+    barcode_wheel.save_drawing(drawing, pretty=True)
 
 
 if __name__ == "__main__":
@@ -4,7 +4,6 @@ import gi
 # gi.require_version("HarfBuzz", "2.4.0")
 from gi.repository import HarfBuzz
 from gi.repository import GLib
-import array
 
 import barcode_wheel
 
@@ -31,16 +30,8 @@ def main():
         0,
     )
 
-    if False:
-        HarfBuzz.buffer_add_utf8(buf, text.encode("utf-8"), 0, -1)
-    elif sys.maxunicode == 0x10FFFF:
-        HarfBuzz.buffer_add_utf32(
-            buf, array.array("I", text.encode("utf-32"))[1:], 0, -1
-        )
-    else:
-        HarfBuzz.buffer_add_utf16(
-            buf, array.array("H", text.encode("utf-16"))[1:], 0, -1
-        )
+    # HarfBuzz decodes UTF-8 itself, so there's no BOM to slice off, and no array to build
+    HarfBuzz.buffer_add_utf8(buf, text.encode("utf-8"), 0, -1)
 
     HarfBuzz.buffer_guess_segment_properties(buf)
     HarfBuzz.shape(font, buf, [])
@@ -1,9 +1,9 @@
 import svgwrite
-from barcode_wheel import svg_uri_embed, make_barcode
+from barcode_wheel import svg_uri_embed, zint_barcode
 
 
 def main():
-    barcode_svg = make_barcode(12345678901)
+    barcode_svg = zint_barcode(12345678901)
     barcode_uri = svg_uri_embed(barcode_svg)
     barcode_uri.seek(0, 0)
 
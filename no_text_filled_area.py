@@ -109,7 +109,7 @@ def main():
     )
     drawing.viewbox(-stroke_width, -stroke_width, window.width + stroke_width * 3, window.height + stroke_width * 1.5)
     drawing.fit()
-    drawing.save(pretty=True)
+    barcode_wheel.save_drawing(drawing, pretty=True)
 
 
 if __name__ == "__main__":
@@ -20,15 +20,18 @@ def placeholder_group(
 
     placeholder_list = list()
 
+    # Add up the total space taken up by padding and widths of all components to the left of each component, once
+    # OrderedDict ensures items are returned following insertion order
+    space_to_the_left = [0.0]
+    for spacings in placeholder_layout.values():
+        space_to_the_left.append(space_to_the_left[-1] + sum(spacings.values()))
+
+    # These only depend on the number of slices, so they're the same for every placeholder
+    half_angle = radians((360 / num_slices) / 2)
+    radius_cos_half_angle = radius * cos(half_angle)
+
     for i, placeholder in enumerate(placeholder_layout):
-        # Add up the total space taken up by padding and widths of all components to the left of this component
-        # OrderedDict ensures items are returned following insertion order
-        percent_distance_from_center = sum(
-            map(
-                lambda spacings: sum(spacings.values()),
-                islice(placeholder_layout.values(), i),
-            )
-        )
+        percent_distance_from_center = space_to_the_left[i]
         # Then add the padding for this component
         # This number represents the percentage of the length of the slice away from the center of the pie where this component will be placed
         percent_distance_from_center += placeholder_layout[placeholder]["padding"]
@@ -40,24 +43,22 @@ def placeholder_group(
             num_slices=num_slices,
         )
 
-        half_angle = radians((360 / num_slices) / 2)
-
         if i == len(placeholder_layout) - 1:
             # The top side of the box this component will go inside must meet both the height above the slice's midline that we've already calculated as height/2, and the arc of the curve at the same height, and since the curve is described by (cos(a), sin(a)), a triangle can be drawn from the top right of the box, to the point where the right side of the box is bisected by the slice's midline, to the center of the pie. This lets us use sin(a) == (height / 2) / r to describe the coordinate for the top right of the box
             # Solving for the angle, we get a == asin(height / (2 * r))
             # This lets us use cos(a) * r as the distance from the center of the pie to the right side of the box, and subtracting the distance to the left, we get its width
             width = cos(
                 asin(height / (2 * radius))
-            ) * radius - percent_distance_from_center * radius * cos(half_angle)
+            ) * radius - percent_distance_from_center * radius_cos_half_angle
         else:
-            width = placeholder_layout[placeholder]["width"] * radius * cos(half_angle)
+            width = placeholder_layout[placeholder]["width"] * radius_cos_half_angle
 
         placeholder_list.append(
             slice_group.add(
                 svgwrite.shapes.Rect(
                     insert=(
                         center[0]
-                        + percent_distance_from_center * cos(half_angle) * radius,
+                        + percent_distance_from_center * radius_cos_half_angle,
                         center[1] - height / 2,
                     ),
                     size=(width, height),
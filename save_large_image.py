@@ -0,0 +1,29 @@
+"""Checks that save_drawing() can still pretty print a drawing with a picture bigger than lxml's 10MB limit embedded in it"""
+
+import sys
+import pathlib
+
+import svgwrite
+
+import barcode_wheel
+
+
+def main():
+    file_name = pathlib.Path(sys.argv[0]).with_suffix(".svg")
+    drawing = svgwrite.Drawing(filename=str(file_name), size=("100%", "100%"))
+
+    # A bit over 12MB once it's base64 encoded
+    picture = b"<svg xmlns='http://www.w3.org/2000/svg'><!--" + b"x" * (9 * 1024 * 1024) + b"--></svg>"
+    picture_uri = barcode_wheel.svg_uri_embed(picture).read()
+
+    drawing.add(drawing.image(href=picture_uri, insert=(0, 0), size=(100, 100)))
+    barcode_wheel.save_drawing(drawing, pretty=True)
+
+    if picture_uri not in file_name.read_text(encoding="utf-8"):
+        raise ValueError("The embedded picture didn't make it into the saved drawing")
+
+    print(f"Saved {file_name} with a {len(picture_uri)} character data uri")
+
+
+if __name__ == "__main__":
+    main()
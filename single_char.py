@@ -17,7 +17,9 @@ def main():
     #text = "Ty"
     text = "M" if len(sys.argv) <= 1 else sys.argv[1]
 
-    metrics = list(barcode_wheel.glyph_metrics(text, "sans-serif"))[0]
+    metrics = barcode_wheel.glyph_metrics(text, "sans-serif")[0]
+    extents = metrics.extents
+    positions = metrics.positions
     bounding_box = barcode_wheel.text_bounding_box(text, "sans-serif")
 
     drawing.add(
@@ -29,11 +31,17 @@ def main():
         )
     )
 
+    # Every line is drawn between the same two ends, so those are only computed once
+    vert_line_top = extents.height * 1.2
+    vert_line_bottom = extents.height * 0.2
+    hori_line_left = extents.x_bearing * 0.2
+    hori_line_right = positions.x_advance
+
     def vert_line(x_pos):
         drawing.add(
             drawing.line(
-                start=(x_pos, metrics.extents.height * 1.2),
-                end=(x_pos, metrics.extents.height * 0.2),
+                start=(x_pos, vert_line_top),
+                end=(x_pos, vert_line_bottom),
                 stroke="black",
                 stroke_width=10,
             )
@@ -42,30 +50,30 @@ def main():
     def hori_line(y_pos):
         drawing.add(
             drawing.line(
-                start=(metrics.extents.x_bearing * 0.2, y_pos),
-                end=(metrics.positions.x_advance, y_pos),
+                start=(hori_line_left, y_pos),
+                end=(hori_line_right, y_pos),
                 stroke="black",
                 stroke_width=10,
             )
         )
 
                    # x_bearing is the left side of the bounding box of the character relative to x=0
-    for metric in [metrics.extents.x_bearing,
+    for metric in [extents.x_bearing,
                    # since width is the absolute width of the character, we add x_bearing to get the right side
                    # of the characters bounding box relative to x=0
-                   metrics.extents.width + metrics.extents.x_bearing,
+                   extents.width + extents.x_bearing,
                    # x_advance is unlikely to be useful, as it's the measurment from x=0 to where the next character should start
-                   #metrics.positions.x_advance,
+                   #positions.x_advance,
                    # Don't know about x_offset
                    #0,
                    ]:
         vert_line(metric)
 
                    # y_bearing is where the top of the character sits compared to y=0
-    for metric in [-metrics.extents.y_bearing,
+    for metric in [-extents.y_bearing,
                    # height is still the actual height of the character, but this is the absolute height,
                    # so to get the bottom of the character relative to y=0, take the y_bearing - height
-                   -metrics.extents.y_bearing - metrics.extents.height,
+                   -extents.y_bearing - extents.height,
                    0,
                    # Don't know about y_advance or y_offset
                    ]:
@@ -84,7 +92,7 @@ def main():
     )
     drawing.viewbox(0, 0, window.width, window.height)
     drawing.fit()
-    drawing.save(pretty=True)
+    barcode_wheel.save_drawing(drawing, pretty=True)
 
 
 if __name__ == "__main__":
@@ -86,15 +86,16 @@ def main():
 
     # Border
     drawing.add(
-        drawing.path(
-            d="M 0 0 L 200 0 L 200 200 L 0 200 Z",
+        drawing.rect(
+            insert=(0, 0),
+            size=(200, 200),
             stroke="black",
             stroke_width=2,
             fill="none",
         )
     )
 
-    drawing.save(pretty=True)
+    barcode_wheel.save_drawing(drawing, pretty=True)
 
 
 if __name__ == "__main__":